@@ -2,26 +2,27 @@
 
 from __future__ import annotations
 
-import json
+import os
 import random
 import re
-import uuid
-from collections import Counter
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+import orjson
+
 # Table name: lowercase letters, digits, -, _ only; 20 chars max
-TABLE_NAME_RE = re.compile(r"^[a-z0-9_-]{1,20}$")
+TABLE_NAME_RE = re.compile(r"[a-z0-9_-]{1,20}")
 
 # Player name: letters, digits, space only; 20 chars max
-PLAYER_NAME_RE = re.compile(r"^[a-zA-Z0-9 ]{1,20}$")
+PLAYER_NAME_RE = re.compile(r"[a-zA-Z0-9 ]{1,20}")
 
 
 def validate_table_name(name: str) -> tuple[bool, str]:
     """Validate table name. Returns (ok, error_message)."""
     sanitized = name.lower().strip()
-    if not TABLE_NAME_RE.match(sanitized):
+    if not TABLE_NAME_RE.fullmatch(sanitized):
         return False, "Table name: lowercase letters, digits, -, _ only; max 20 characters"
     return True, sanitized
 
@@ -29,7 +30,7 @@ def validate_table_name(name: str) -> tuple[bool, str]:
 def validate_player_name(name: str) -> tuple[bool, str]:
     """Validate player name. Returns (ok, error_message_or_sanitized)."""
     sanitized = name.strip()
-    if not PLAYER_NAME_RE.match(sanitized):
+    if not PLAYER_NAME_RE.fullmatch(sanitized):
         return False, "Player name: letters, digits, space only; max 20 characters"
     return True, sanitized
 
@@ -39,26 +40,63 @@ def validate_player_name(name: str) -> tuple[bool, str]:
 # -5    | Hole-in-One      | 4
 # 0     | Mulligan         | 8
 # 1-12  | various          | 8 each
-DECK_SPEC = [
+DECK_SPEC = (
     (-5, 4),   # Hole-in-One
     (0, 8),    # Mulligan
-]
-for v in range(1, 13):
-    DECK_SPEC.append((v, 8))
-
-
-@dataclass
+) + tuple((v, 8) for v in range(1, 13))
+
+# All 108 card values, expanded once at import
+_DECK_VALUES = tuple(value for value, count in DECK_SPEC for _ in range(count))
+
+# Module-private RNG used for shuffling
+_RNG = random.Random()
+
+
+@lru_cache(maxsize=1024)
+def _table_path(data_dir: Path, table_name: str) -> Path:
+    """Path of a table's JSON file; built once per table instead of on every load/save."""
+    return data_dir / f"{table_name}.json"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write via a temp file + rename so readers never see a half-written table (no fsync)."""
+    tmp = f"{path}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]  # os.write may write fewer bytes than asked
+        os.close(fd)
+        fd = -1
+        os.replace(tmp, path)
+    except BaseException:
+        if fd >= 0:
+            os.close(fd)
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+@dataclass(slots=True)
 class Card:
     value: int
     face_up: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class Player:
     id: str
     name: str
     hand: list[Card] = field(default_factory=list)
     revealed_count: int = 0  # How many cards they've flipped face-up (0-2 in reveal phase)
+    # Face-down cards left in hand, kept in step with every flip so the hole-end check is O(1).
+    # Derived from hand, so not persisted (orjson skips _-prefixed fields).
+    _face_down: int = field(default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._face_down = sum(1 for c in self.hand if not c.face_up)
 
 
 @dataclass
@@ -82,6 +120,10 @@ class TableState:
     round_scores: dict[str, int] = field(default_factory=dict)  # this round's scores
     score_history: list[dict] = field(default_factory=list)  # [{round: n, scores: {pid: score}}, ...]
     last_affected_card: Optional[tuple[str, int]] = None  # (player_id, card_index) for highlight
+    # Memoized to_public_dict(); not persisted (orjson skips _-prefixed fields)
+    _public_cache: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    # player_id -> index into players; rebuilt lazily by player_index()
+    _id_to_idx: dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
 
     DATA_DIR = Path("/play9")
 
@@ -90,69 +132,68 @@ class TableState:
         path = cls._path(table_name)
         if not path.exists():
             return None
-        data = json.loads(path.read_text())
+        data = orjson.loads(path.read_bytes())
         return cls.from_dict(data)
 
     def save(self) -> None:
-        self.DATA_DIR.mkdir(parents=True, exist_ok=True)
-        self._path(self.name).write_text(json.dumps(self.to_dict(), indent=2))
+        """Write this table to disk now."""
+        self._public_cache = None
+        _dirty_tables.pop(self.name, None)
+        # orjson walks the dataclasses directly; no intermediate dict graph
+        _write_atomic(self._path(self.name), orjson.dumps(self))
 
-    @classmethod
-    def _path(cls, table_name: str) -> Path:
-        return cls.DATA_DIR / f"{table_name}.json"
-
-    def to_dict(self) -> dict:
-        def card_to_dict(c: Card) -> dict:
-            return {"value": c.value, "face_up": c.face_up}
+    def mark_dirty(self) -> None:
+        """Record an in-memory change; the write is deferred to take_dirty_snapshots()/write_snapshots()."""
+        self._public_cache = None
+        _dirty_tables[self.name] = self
 
-        def player_to_dict(p: Player) -> dict:
-            return {
-                "id": p.id,
-                "name": p.name,
-                "hand": [card_to_dict(c) for c in p.hand],
-                "revealed_count": p.revealed_count,
-            }
+    def is_dirty(self) -> bool:
+        """True if this table has changes not yet handed to write_snapshots()."""
+        return self.name in _dirty_tables
 
-        d = {
-            "name": self.name,
-            "players": [player_to_dict(p) for p in self.players],
-            "phase": self.phase,
-            "round_num": self.round_num,
-            "current_player_idx": self.current_player_idx,
-            "draw_pile": [{"value": c.value, "face_up": False} for c in self.draw_pile],
-            "discard_pile": [card_to_dict(c) for c in self.discard_pile],
-            "dealer_idx": self.dealer_idx,
-            "scores": self.scores,
-        }
-        if self.drawn_card:
-            d["drawn_card"] = card_to_dict(self.drawn_card)
-            d["drawn_from"] = self.drawn_from
-        if self.must_flip_after_discard:
-            d["must_flip_after_discard"] = True
-        if self.hole_ended_by is not None:
-            d["hole_ended_by"] = self.hole_ended_by
-            d["final_turns_remaining"] = self.final_turns_remaining
-        if self.round_scores:
-            d["round_scores"] = self.round_scores
-        if self.score_history:
-            d["score_history"] = self.score_history
-        if self.last_affected_card:
-            d["last_affected_card"] = list(self.last_affected_card)
-        return d
+    @classmethod
+    def _path(cls, table_name: str) -> Path:
+        return _table_path(cls.DATA_DIR, table_name)
+
+    def player_index(self, player_id: str) -> Optional[int]:
+        """Index of player_id in players, or None. Rebuilds the id map if players changed."""
+        idx = self._id_to_idx.get(player_id)
+        if idx is None or idx >= len(self.players) or self.players[idx].id != player_id:
+            self._id_to_idx = {p.id: i for i, p in enumerate(self.players)}
+            idx = self._id_to_idx.get(player_id)
+        return idx
+
+    def has_player(self, player_id: str) -> bool:
+        return self.player_index(player_id) is not None
+
+    def remove_player(self, player_id: str) -> bool:
+        """Drop player_id from players. Returns False if they were not at the table."""
+        idx = self.player_index(player_id)
+        if idx is None:
+            return False
+        del self.players[idx]
+        self._id_to_idx = {}  # later indices shifted
+        return True
 
     FACE_DOWN_MASK = -99
 
     def to_public_dict(self) -> dict:
-        """Sanitized state for clients: no hidden card values. Face-down = -99."""
-        def hand_to_public(hand: list) -> list:
-            return [
-                {"value": c.value if c.face_up else self.FACE_DOWN_MASK, "face_up": c.face_up}
-                for c in hand
-            ]
+        """Sanitized state for clients: no hidden card values. Hands are flat values, face-down = -99.
+
+        Memoized until the next mark_dirty()/save(); every mutation goes through one of
+        them before the state is published. Callers must copy rather than mutate the returned dict.
+        """
+        if self._public_cache is None:
+            self._public_cache = self._build_public_dict()
+        return self._public_cache
 
+    def _build_public_dict(self) -> dict:
+        mask = self.FACE_DOWN_MASK
         discard = self.discard_pile
-        discard_top = [c.value for c in discard[-2:]] if discard else []
-        discard_top.reverse()
+        if len(discard) >= 2:
+            discard_top = [discard[-1].value, discard[-2].value]
+        else:
+            discard_top = [discard[-1].value] if discard else []
 
         d = {
             "name": self.name,
@@ -160,7 +201,8 @@ class TableState:
                 {
                     "id": p.id,
                     "name": p.name,
-                    "hand": hand_to_public(p.hand),
+                    # Flat card values; face-down cards are FACE_DOWN_MASK
+                    "hand": [c.value if c.face_up else mask for c in p.hand],
                     "revealed_count": p.revealed_count,
                 }
                 for p in self.players
@@ -172,7 +214,9 @@ class TableState:
             "discard_pile_count": len(self.discard_pile),
             "discard_pile_top": discard_top,
             "dealer_idx": self.dealer_idx,
-            "scores": self.scores,
+            # scores and score_history are updated in place; copy so earlier published
+            # states (the broadcast delta baseline) don't change underneath
+            "scores": dict(self.scores),
         }
         if self.drawn_card:
             d["drawn_card"] = {"value": self.drawn_card.value, "face_up": True}
@@ -185,7 +229,7 @@ class TableState:
         if self.round_scores:
             d["round_scores"] = self.round_scores
         if self.score_history:
-            d["score_history"] = self.score_history
+            d["score_history"] = list(self.score_history)
         if self.last_affected_card:
             d["last_affected_card"] = list(self.last_affected_card)
         return d
@@ -226,16 +270,60 @@ class TableState:
         )
 
 
+# Ensure the data dir exists at import
+try:
+    TableState.DATA_DIR.mkdir(parents=True, exist_ok=True)
+except OSError:
+    pass
+
+# Tables changed in memory but not yet written: table_name -> state
+_dirty_tables: dict[str, TableState] = {}
+
+
+def take_dirty_snapshots() -> list[tuple[TableState, bytes]]:
+    """Encode every dirty table and clear the dirty set. Returns [(table, data), ...].
+
+    Encoding happens here, on the caller's thread, so the snapshot is consistent even
+    if the tables change again while write_snapshots() runs elsewhere."""
+    snapshots = [(t, orjson.dumps(t)) for t in _dirty_tables.values()]
+    _dirty_tables.clear()
+    return snapshots
+
+
+def write_snapshots(snapshots: list[tuple[TableState, bytes]]) -> list[tuple[TableState, OSError]]:
+    """Write each snapshot; one failing file doesn't stop the rest. Returns the failures."""
+    failed = []
+    for table, data in snapshots:
+        try:
+            _write_atomic(table._path(table.name), data)
+        except OSError as e:
+            failed.append((table, e))
+    return failed
+
+
+def requeue_dirty(tables: list[TableState]) -> None:
+    """Put tables whose write failed back in the dirty set, unless a newer change already did."""
+    for table in tables:
+        _dirty_tables.setdefault(table.name, table)
+
+
 def build_deck() -> list[Card]:
     """Build and shuffle a 108-card Play Nine deck."""
-    deck: list[Card] = []
-    for value, count in DECK_SPEC:
-        for _ in range(count):
-            deck.append(Card(value=value, face_up=False))
-    random.shuffle(deck)
+    deck = [Card(value) for value in _DECK_VALUES]
+    _RNG.shuffle(deck)
     return deck
 
 
+def _deal_hands(players: list[Player], deck: list[Card]) -> None:
+    """Deal 8 cards to each player off the top (end) of the deck, in place."""
+    split = len(deck) - len(players) * 8
+    dealt = deck[split:]
+    del deck[split:]
+    for i, p in enumerate(players):
+        p.hand = dealt[i * 8:(i + 1) * 8]
+        p._face_down = 8
+
+
 def reset_table_to_empty(table: TableState) -> None:
     """Reset table to no-game state: full draw pile, empty discard, no players."""
     table.players = []
@@ -275,17 +363,22 @@ def restart_game(table: TableState) -> Optional[str]:
     return _deal_new_round(table, round_num=1)
 
 
-def _deal_new_round(table: TableState, round_num: int = 1) -> Optional[str]:
-    """Deal a new round. Keeps players, resets hands and piles."""
-    table.last_affected_card = None
+def _deal_cards(table: TableState) -> None:
+    """Shuffle a fresh deck, deal every hand face-down and turn up the first discard."""
     deck = build_deck()
+    _deal_hands(table.players, deck)
     for p in table.players:
-        p.hand = [deck.pop() for _ in range(8)]
         p.revealed_count = 0
     table.draw_pile = deck
     top = table.draw_pile.pop()
     top.face_up = True
     table.discard_pile = [top]
+
+
+def _deal_new_round(table: TableState, round_num: int = 1) -> Optional[str]:
+    """Deal a new round. Keeps players, resets hands and piles."""
+    table.last_affected_card = None
+    _deal_cards(table)
     table.drawn_card = None
     table.drawn_from = None
     table.must_flip_after_discard = False
@@ -302,9 +395,10 @@ def reveal_card(table: TableState, player_id: str, card_index: int) -> Optional[
     """Flip a card face-up during reveal phase. Returns error or None."""
     if table.phase != "reveal":
         return "Not in reveal phase"
-    player = next((p for p in table.players if p.id == player_id), None)
-    if not player:
+    idx = table.player_index(player_id)
+    if idx is None:
         return "Not a player"
+    player = table.players[idx]
     if player.revealed_count >= 2:
         return "Already revealed 2 cards"
     if not 0 <= card_index < len(player.hand):
@@ -312,7 +406,7 @@ def reveal_card(table: TableState, player_id: str, card_index: int) -> Optional[
     card = player.hand[card_index]
     if card.face_up:
         return "Card already face-up"
-    card.face_up = True
+    _flip_up(player, card)
     player.revealed_count += 1
     table.last_affected_card = (player_id, card_index)
     # Check if all players have revealed 2 → transition to play
@@ -328,8 +422,7 @@ def _advance_turn(table: TableState) -> None:
         just_finished = table.current_player_idx
         table.final_turns_remaining = [i for i in table.final_turns_remaining if i != just_finished]
         # Flip remaining face-down cards for tallying
-        for c in table.players[just_finished].hand:
-            c.face_up = True
+        _flip_all_up(table.players[just_finished])
         if not table.final_turns_remaining:
             _finish_hole(table)
             return
@@ -340,16 +433,42 @@ def _advance_turn(table: TableState) -> None:
 
 def _check_hole_end(table: TableState, player_idx: int) -> bool:
     """True if this player just went all face-up."""
-    p = table.players[player_idx]
-    return all(c.face_up for c in p.hand)
+    return table.players[player_idx]._face_down == 0
+
+
+def _flip_up(player: Player, card: Card) -> None:
+    """Turn one of player's face-down cards face-up."""
+    card.face_up = True
+    player._face_down -= 1
+
+
+def _flip_all_up(player: Player) -> None:
+    """Turn every card in player's hand face-up; a no-op once none are face-down."""
+    if player._face_down:
+        for c in player.hand:
+            c.face_up = True
+        player._face_down = 0
+
+
+def _begin_final_turns(table: TableState, idx: int) -> None:
+    """Player idx just went all face-up: give everyone else one final turn, or end the hole."""
+    n = len(table.players)
+    table.hole_ended_by = idx
+    # Continue in same direction; everyone after the finisher gets one final turn (until we would reach finisher again)
+    table.final_turns_remaining = [
+        j for j in ((idx + i) % n for i in range(1, n)) if not _check_hole_end(table, j)
+    ]
+    if table.final_turns_remaining:
+        table.current_player_idx = table.final_turns_remaining[0]
+    else:
+        _finish_hole(table)
 
 
 def _finish_hole(table: TableState) -> None:
     """Flip remaining face-downs, score, transition to scoring phase."""
     table.last_affected_card = None
     for p in table.players:
-        for c in p.hand:
-            c.face_up = True
+        _flip_all_up(p)
     table.round_scores = {p.id: _score_hand(p.hand) for p in table.players}
     for pid, s in table.round_scores.items():
         table.scores[pid] = table.scores.get(pid, 0) + s
@@ -375,19 +494,13 @@ def advance_from_scoring(table: TableState) -> Optional[str]:
         table.score_history = []
         for p in table.players:
             p.hand = []
+            p._face_down = 0
             p.revealed_count = 0
         table.draw_pile = []
         table.discard_pile = []
         return None
     table.round_num += 1
-    deck = build_deck()
-    for p in table.players:
-        p.hand = [deck.pop() for _ in range(8)]
-        p.revealed_count = 0
-    table.draw_pile = deck
-    top = table.draw_pile.pop()
-    top.face_up = True
-    table.discard_pile = [top]
+    _deal_cards(table)
     table.dealer_idx = (table.dealer_idx + 1) % len(table.players)
     table.current_player_idx = (table.dealer_idx + 1) % len(table.players)
     table.round_scores = {}
@@ -399,23 +512,22 @@ def _score_hand(hand: list[Card]) -> int:
     """Score a hand (4 cols x 2 rows). Same in column = 0 (or -10 if both -5). Different = sum."""
     if len(hand) != 8:
         return sum(c.value for c in hand if c.face_up)
-    cols = [[hand[i], hand[i + 4]] for i in range(4)]
-
     total = 0
-    for col in cols:
-        v0, v1 = col[0].value, col[1].value
+    # Bonus: multiple columns with the SAME pair value (e.g. two columns of 1/1).
+    # Fixed-size tally indexed by value + 5 (values run -5..12), max tracked as we go.
+    matches = [0] * 18
+    max_same = 0
+    for i in range(4):
+        v0, v1 = hand[i].value, hand[i + 4].value
         if v0 == v1:
             if v0 == -5:
                 total += -10
-            else:
-                total += 0
+            n = matches[v0 + 5] = matches[v0 + 5] + 1
+            if n > max_same:
+                max_same = n
         else:
             total += v0 + v1
 
-    # Bonus: multiple columns with the SAME pair value (e.g. two columns of 1/1)
-    pair_values = [col[0].value for col in cols if col[0].value == col[1].value]
-    counts = Counter(pair_values)
-    max_same = max(counts.values()) if counts else 0
     if max_same >= 3:
         total += -15
     elif max_same >= 2:
@@ -428,7 +540,7 @@ def draw_from_draw(table: TableState, player_id: str) -> Optional[str]:
     """Draw top card from draw pile. Must be current player, no card already drawn."""
     if table.phase != "play":
         return "Not in play phase"
-    idx = next((i for i, p in enumerate(table.players) if p.id == player_id), None)
+    idx = table.player_index(player_id)
     if idx is None:
         return "Not a player"
     if idx != table.current_player_idx:
@@ -448,7 +560,7 @@ def draw_from_discard(table: TableState, player_id: str) -> Optional[str]:
     """Draw top card from discard pile."""
     if table.phase != "play":
         return "Not in play phase"
-    idx = next((i for i, p in enumerate(table.players) if p.id == player_id), None)
+    idx = table.player_index(player_id)
     if idx is None:
         return "Not a player"
     if idx != table.current_player_idx:
@@ -467,34 +579,25 @@ def play_replace(table: TableState, player_id: str, card_index: int) -> Optional
     """Replace hand card with drawn card; old card goes to discard."""
     if table.phase != "play" or table.drawn_card is None:
         return "No card drawn"
-    idx = next((i for i, p in enumerate(table.players) if p.id == player_id), None)
+    idx = table.player_index(player_id)
     if idx is None or idx != table.current_player_idx:
         return "Not your turn"
     if not 0 <= card_index < 8:
         return "Invalid card index"
     player = table.players[idx]
     old = player.hand[card_index]
-    player.hand[card_index] = table.drawn_card
+    new = table.drawn_card
+    player.hand[card_index] = new
+    player._face_down += (not new.face_up) - (not old.face_up)
     old.face_up = True
     table.discard_pile.append(old)
     table.last_affected_card = (player_id, card_index)
     table.drawn_card = None
     table.drawn_from = None
     if _check_hole_end(table, idx):
-        n = len(table.players)
-        table.hole_ended_by = idx
-        # Continue in same direction; everyone after the finisher gets one final turn (until we would reach finisher again)
-        table.final_turns_remaining = [
-            (idx + i) % n
-            for i in range(1, n)
-            if not _check_hole_end(table, (idx + i) % n)
-        ]
-        if table.final_turns_remaining:
-            table.current_player_idx = table.final_turns_remaining[0]
-        else:
-            _finish_hole(table)
-        return None
-    _advance_turn(table)
+        _begin_final_turns(table, idx)
+    else:
+        _advance_turn(table)
     return None
 
 
@@ -502,7 +605,7 @@ def play_discard_flip(table: TableState, player_id: str, card_index: int) -> Opt
     """Discard drawn card and flip a face-down card."""
     if table.phase != "play" or table.drawn_card is None:
         return "No card drawn"
-    idx = next((i for i, p in enumerate(table.players) if p.id == player_id), None)
+    idx = table.player_index(player_id)
     if idx is None or idx != table.current_player_idx:
         return "Not your turn"
     if not 0 <= card_index < 8:
@@ -514,23 +617,12 @@ def play_discard_flip(table: TableState, player_id: str, card_index: int) -> Opt
     table.discard_pile.append(table.drawn_card)
     table.drawn_card = None
     table.drawn_from = None
-    card.face_up = True
+    _flip_up(player, card)
     table.last_affected_card = (player_id, card_index)
     if _check_hole_end(table, idx):
-        n = len(table.players)
-        table.hole_ended_by = idx
-        # Continue in same direction; everyone after the finisher gets one final turn (until we would reach finisher again)
-        table.final_turns_remaining = [
-            (idx + i) % n
-            for i in range(1, n)
-            if not _check_hole_end(table, (idx + i) % n)
-        ]
-        if table.final_turns_remaining:
-            table.current_player_idx = table.final_turns_remaining[0]
-        else:
-            _finish_hole(table)
-        return None
-    _advance_turn(table)
+        _begin_final_turns(table, idx)
+    else:
+        _advance_turn(table)
     return None
 
 
@@ -540,7 +632,7 @@ def play_flip_after_discard(table: TableState, player_id: str, card_index: int)
         return "Not in play phase"
     if not table.must_flip_after_discard:
         return "No flip required"
-    idx = next((i for i, p in enumerate(table.players) if p.id == player_id), None)
+    idx = table.player_index(player_id)
     if idx is None or idx != table.current_player_idx:
         return "Not your turn"
     if not 0 <= card_index < 8:
@@ -549,24 +641,13 @@ def play_flip_after_discard(table: TableState, player_id: str, card_index: int)
     card = player.hand[card_index]
     if card.face_up:
         return "Card already face-up"
-    card.face_up = True
+    _flip_up(player, card)
     table.must_flip_after_discard = False
     table.last_affected_card = (player_id, card_index)
     if _check_hole_end(table, idx):
-        n = len(table.players)
-        table.hole_ended_by = idx
-        # Continue in same direction; everyone after the finisher gets one final turn (until we would reach finisher again)
-        table.final_turns_remaining = [
-            (idx + i) % n
-            for i in range(1, n)
-            if not _check_hole_end(table, (idx + i) % n)
-        ]
-        if table.final_turns_remaining:
-            table.current_player_idx = table.final_turns_remaining[0]
-        else:
-            _finish_hole(table)
-        return None
-    _advance_turn(table)
+        _begin_final_turns(table, idx)
+    else:
+        _advance_turn(table)
     return None
 
 
@@ -576,7 +657,7 @@ def play_put_back(table: TableState, player_id: str) -> Optional[str]:
         return "No card drawn"
     if table.drawn_from != "discard":
         return "Can only put back when drawn from discard"
-    idx = next((i for i, p in enumerate(table.players) if p.id == player_id), None)
+    idx = table.player_index(player_id)
     if idx is None or idx != table.current_player_idx:
         return "Not your turn"
     table.discard_pile.append(table.drawn_card)
@@ -591,11 +672,11 @@ def play_discard_only(table: TableState, player_id: str) -> Optional[str]:
         return "No card drawn"
     if table.drawn_from != "draw":
         return "Cannot discard back to discard pile when drawn from discard"
-    idx = next((i for i, p in enumerate(table.players) if p.id == player_id), None)
+    idx = table.player_index(player_id)
     if idx is None or idx != table.current_player_idx:
         return "Not your turn"
     player = table.players[idx]
-    face_down = sum(1 for c in player.hand if not c.face_up)
+    face_down = player._face_down
     table.discard_pile.append(table.drawn_card)
     table.drawn_card = None
     table.drawn_from = None
@@ -607,28 +688,36 @@ def play_discard_only(table: TableState, player_id: str) -> Optional[str]:
 
 
 def create_player(name: str) -> Player:
-    return Player(id=str(uuid.uuid4()), name=name)
+    # 64 random bits is plenty to keep ids unique within a table
+    return Player(id=os.urandom(8).hex(), name=name)
 
 
 def add_player_to_table(
-    table_name: str, player_name: str
+    table_name: str, player_name: str, table: Optional[TableState] = None
 ) -> tuple[Optional[Player], Optional[str], Optional[str]]:
     """Add a new player to a table. Creates table if needed. Returns (player, table_name, error).
-    Fails if a player with the same name already exists (use find_player_by_name for reconnect)."""
+    Fails if a player with the same name already exists (use find_player_by_name for reconnect).
+    Pass table to add to an already-loaded state instead of reading it from disk; it is
+    then only marked dirty and the caller decides when it is written."""
     ok, name = validate_player_name(player_name)
     if not ok:
         return None, None, name
     ok, tn = validate_table_name(table_name)
     if not ok:
         return None, None, tn
-    table = TableState.load(tn) or TableState(name=tn)
+    owned = table is None
+    if owned:
+        table = TableState.load(tn) or TableState(name=tn)
     if any(p.name == name for p in table.players):
         return None, None, "Player name already taken"
     player = create_player(name)
     table.players.append(player)
     if table.phase == "empty":
         table.phase = "waiting"
-    table.save()
+    if owned:
+        table.save()
+    else:
+        table.mark_dirty()
     return player, tn, None
 
 
@@ -1,12 +1,14 @@
 import asyncio
-import json
+import logging
 import os
 import time
+from collections import defaultdict
 from pathlib import Path
 
+import orjson
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from typing import Optional
 
 from pydantic import BaseModel
@@ -22,34 +24,127 @@ from app.game import (
     play_put_back,
     play_flip_after_discard,
     play_replace,
+    requeue_dirty,
     reset_table_to_empty,
     restart_game,
     reveal_card,
     start_game,
+    take_dirty_snapshots,
     validate_table_name,
+    write_snapshots,
     TableState,
 )
-from app.ws import manager, CLEANUP_INTERVAL
+from app.ws import encode_frame, manager, CLEANUP_INTERVAL
 
-app = FastAPI(title="Play Nine")
+app = FastAPI(title="Play Nine", default_response_class=ORJSONResponse)
+
+logger = logging.getLogger(__name__)
 
 # Restart vote state: table_name -> { requested_by, requested_by_name, yes_votes, requested_at }
 _restart_votes: dict = {}
 
+# In-memory table states: table_name -> TableState. Disk is read once per table; every
+# mutation goes through _mark_dirty(table), so the files stay current across restarts.
+# Tables left with no players are dropped again once written (see _evict_idle_tables).
+_tables: dict[str, TableState] = {}
+
+SAVE_DELAY = 0.5  # seconds to coalesce a burst of changes into one write per table
+SAVE_RETRY_DELAY = 5.0  # seconds before retrying tables whose write failed
+# Created by start_cleanup_task() on the serving loop; an Event is bound to the loop it
+# first waits on, so one made at import would break a second app lifespan (tests)
+_dirty_event: Optional[asyncio.Event] = None
+_flush_task: Optional[asyncio.Task] = None
+_write_task: Optional[asyncio.Task] = None  # latest _write_in_thread(); shutdown awaits it
+
+
+def _mark_dirty(table: TableState) -> None:
+    """Queue the table for the background writer instead of writing it inline."""
+    table.mark_dirty()
+    if _dirty_event is not None:
+        _dirty_event.set()
+
+
+async def _write_in_thread(snapshots: list) -> bool:
+    """Write snapshots off the event loop, logging and requeueing failures. Returns True
+    if anything failed."""
+    try:
+        failed = await asyncio.to_thread(write_snapshots, snapshots)
+    except Exception:
+        logger.exception("Saving tables failed")
+        failed = [(table, None) for table, _ in snapshots]
+    else:
+        for table, error in failed:
+            logger.error("Saving table %s failed: %s", table.name, error)
+    requeue_dirty([table for table, _ in failed])
+    return bool(failed)
+
+
+async def _flush_loop() -> None:
+    """Write dirty tables off the event loop, at most once per SAVE_DELAY per burst."""
+    global _write_task
+    while True:
+        await _dirty_event.wait()
+        await asyncio.sleep(SAVE_DELAY)
+        _dirty_event.clear()
+        try:
+            snapshots = take_dirty_snapshots()
+        except Exception:
+            # Nothing left the dirty set, so the retry below covers every table
+            logger.exception("Encoding tables failed")
+            retry = True
+        else:
+            # Shielded: cancelling this loop at shutdown must not abandon a write that's
+            # already running in its thread; flush_tables_on_shutdown() waits for it instead
+            _write_task = asyncio.create_task(_write_in_thread(snapshots))
+            retry = await asyncio.shield(_write_task)
+        _evict_idle_tables()
+        if retry:
+            await asyncio.sleep(SAVE_RETRY_DELAY)
+            _dirty_event.set()
+
+
+def _on_flush_loop_done(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Table writer stopped; changes are no longer saved", exc_info=task.exception())
+
+
+def _evict_idle_tables() -> None:
+    """Forget tables with no players whose state is on disk; _get_table() reloads on use.
+    Only called once a write has finished, so "not dirty" means the file is current."""
+    idle = [name for name, t in _tables.items() if not t.players and not t.is_dirty()]
+    for name in idle:
+        del _tables[name]
+        _restart_votes.pop(name, None)
+
+
+def _get_table(table_name: str) -> Optional[TableState]:
+    """Return the table's state from memory, loading it from disk on first use."""
+    table = _tables.get(table_name)
+    if table is None:
+        table = TableState.load(table_name)
+        if table is not None:
+            _tables[table_name] = table
+    return table
+
+
+# Built once; like to_public_dict(), consumers only read it (enrichment copies the top level)
+_EMPTY_TABLE_STATE = {
+    "name": "",
+    "phase": "empty",
+    "players": [],
+    "round_num": 0,
+    "current_player_idx": 0,
+    "draw_pile_count": 108,
+    "discard_pile_count": 0,
+    "discard_pile_top": [],
+    "dealer_idx": 0,
+    "scores": {},
+}
+
+
 def _empty_table_state(table_name: str = "") -> dict:
     """State when table has no players or doesn't exist."""
-    return {
-        "name": table_name,
-        "phase": "empty",
-        "players": [],
-        "round_num": 0,
-        "current_player_idx": 0,
-        "draw_pile_count": 108,
-        "discard_pile_count": 0,
-        "discard_pile_top": [],
-        "dealer_idx": 0,
-        "scores": {},
-    }
+    return {**_EMPTY_TABLE_STATE, "name": table_name}
 
 
 def _merge_restart_vote_state(table_name: str, state: dict) -> dict:
@@ -73,7 +168,7 @@ async def _broadcast_with_restart_state(table_name: str, state: dict) -> None:
 
 async def _broadcast_table_state(table_name: str) -> None:
     """Load table state and broadcast to all connected clients."""
-    table = TableState.load(table_name)
+    table = _get_table(table_name)
     state = table.to_public_dict() if table else _empty_table_state(table_name)
     await _broadcast_with_restart_state(table_name, state)
 
@@ -81,19 +176,21 @@ async def _broadcast_table_state(table_name: str) -> None:
 async def _force_leave_inactive_players() -> None:
     """Remove players inactive for over 60 seconds from their tables."""
     to_remove = await manager.get_players_inactive_over_60s()
+    by_table: dict[str, list[str]] = defaultdict(list)
     for table_name, player_id in to_remove:
-        table = TableState.load(table_name)
+        by_table[table_name].append(player_id)
+    for table_name, player_ids in by_table.items():
+        await asyncio.gather(*(manager.clear_inactive(table_name, pid) for pid in player_ids))
+        table = _get_table(table_name)
         if not table:
-            await manager.clear_inactive(table_name, player_id)
             continue
-        if not any(p.id == player_id for p in table.players):
-            await manager.clear_inactive(table_name, player_id)
+        gone = set(player_ids)
+        if not any(p.id in gone for p in table.players):
             continue
-        table.players = [p for p in table.players if p.id != player_id]
-        await manager.clear_inactive(table_name, player_id)
+        table.players = [p for p in table.players if p.id not in gone]
         if not table.players:
             reset_table_to_empty(table)
-        table.save()
+        _mark_dirty(table)
         state = table.to_public_dict()
         await _broadcast_with_restart_state(table_name, state)
 
@@ -103,12 +200,36 @@ async def start_cleanup_task() -> None:
     """Background tasks: disconnect stale connections, force-leave inactive players."""
 
     async def cleanup_loop() -> None:
+        # Fixed ticks on the loop's monotonic clock, so time spent cleaning doesn't add drift
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
         while True:
-            await asyncio.sleep(CLEANUP_INTERVAL)
+            next_tick += CLEANUP_INTERVAL
+            await asyncio.sleep(max(0, next_tick - loop.time()))
             await manager.cleanup_stale_connections(_broadcast_table_state)
             await _force_leave_inactive_players()
 
+    global _dirty_event, _flush_task
+    manager.start_clock()
     asyncio.create_task(cleanup_loop())
+    _dirty_event = asyncio.Event()
+    _dirty_event.set()  # picks up anything marked dirty before the loop started
+    _flush_task = asyncio.create_task(_flush_loop())
+    _flush_task.add_done_callback(_on_flush_loop_done)
+
+
+@app.on_event("shutdown")
+async def flush_tables_on_shutdown() -> None:
+    """Write anything still pending so a clean stop loses no moves."""
+    if _flush_task is not None:
+        _flush_task.cancel()
+        await asyncio.gather(_flush_task, return_exceptions=True)
+    # Let a write already in its thread finish (and requeue its failures) first, so it
+    # can't land on top of the newer snapshot written below
+    if _write_task is not None:
+        await _write_task
+    for table, error in write_snapshots(take_dirty_snapshots()):
+        logger.error("Saving table %s failed: %s", table.name, error)
 
 STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
 STATIC_DIR.mkdir(exist_ok=True)
@@ -126,15 +247,17 @@ async def lobby():
 
 
 ALREADY_CONNECTED_MSG = "Player already connected elsewhere"
+_ALREADY_CONNECTED_FRAME = orjson.dumps({"error": ALREADY_CONNECTED_MSG})
 
 
 def _ensure_table_exists(table_name: str) -> TableState:
     """Create table with no-game state if it doesn't exist. Returns the table."""
-    table = TableState.load(table_name)
+    table = _get_table(table_name)
     if not table:
         table = TableState(name=table_name)
         reset_table_to_empty(table)
-        table.save()
+        _mark_dirty(table)
+        _tables[table_name] = table
     return table
 
 
@@ -148,20 +271,19 @@ async def join_table(req: JoinRequest):
     player_name = (req.player_name or "").strip()
     if not player_name:
         await _broadcast_with_restart_state(table_name, table.to_public_dict())
-        return {"table_name": table_name}
+        return ORJSONResponse({"table_name": table_name})
     existing = find_player_by_name(table, player_name)
     if existing:
         if await manager.is_player_connected(table_name, existing.id):
             raise HTTPException(status_code=400, detail=ALREADY_CONNECTED_MSG)
-        table = TableState.load(table_name)
         await _broadcast_with_restart_state(table_name, table.to_public_dict())
-        return {"player_id": existing.id, "table_name": table_name}
-    player, _, err = add_player_to_table(req.table_name, player_name)
+        return ORJSONResponse({"player_id": existing.id, "table_name": table_name})
+    player, _, err = add_player_to_table(table_name, player_name, table)
     if err:
         raise HTTPException(status_code=400, detail=err)
-    table = TableState.load(table_name)
+    _mark_dirty(table)
     await _broadcast_with_restart_state(table_name, table.to_public_dict())
-    return {"player_id": player.id, "table_name": table_name}
+    return ORJSONResponse({"player_id": player.id, "table_name": table_name})
 
 
 class StartRequest(BaseModel):
@@ -175,17 +297,17 @@ async def start_table_game(req: StartRequest):
     ok, tn = validate_table_name(req.table_name)
     if not ok:
         raise HTTPException(status_code=400, detail="Invalid table name")
-    table = TableState.load(tn)
+    table = _get_table(tn)
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
-    if not any(p.id == req.player_id for p in table.players):
+    if not table.has_player(req.player_id):
         raise HTTPException(status_code=403, detail="Not a player at this table")
     err = start_game(table)
     if err:
         raise HTTPException(status_code=400, detail=err)
-    table.save()
+    _mark_dirty(table)
     await _broadcast_with_restart_state(tn, table.to_public_dict())
-    return {"ok": True}
+    return ORJSONResponse({"ok": True})
 
 
 class RevealRequest(BaseModel):
@@ -200,15 +322,15 @@ async def reveal_card_endpoint(req: RevealRequest):
     ok, tn = validate_table_name(req.table_name)
     if not ok:
         raise HTTPException(status_code=400, detail="Invalid table name")
-    table = TableState.load(tn)
+    table = _get_table(tn)
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
     err = reveal_card(table, req.player_id, req.card_index)
     if err:
         raise HTTPException(status_code=400, detail=err)
-    table.save()
+    _mark_dirty(table)
     await _broadcast_with_restart_state(tn, table.to_public_dict())
-    return {"ok": True}
+    return ORJSONResponse({"ok": True})
 
 
 class LeaveRequest(BaseModel):
@@ -222,16 +344,16 @@ async def leave_table(req: LeaveRequest):
     ok, tn = validate_table_name(req.table_name)
     if not ok:
         raise HTTPException(status_code=400, detail="Invalid table name")
-    table = TableState.load(tn)
+    table = _get_table(tn)
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
-    table.players = [p for p in table.players if p.id != req.player_id]
+    table.remove_player(req.player_id)
     if not table.players:
         reset_table_to_empty(table)
-    table.save()
+    _mark_dirty(table)
     state = table.to_public_dict()
     await _broadcast_with_restart_state(tn, state)
-    return {"ok": True}
+    return ORJSONResponse({"ok": True})
 
 
 @app.get("/play9/table/{table_name}")
@@ -252,160 +374,136 @@ async def player_view(table_name: str):
     return FileResponse(STATIC_DIR / "player.html")
 
 
-async def _handle_ws_action(tn: str, player_id: str | None, msg: dict) -> dict | None:
-    """Process a WebSocket action. Returns state dict on success, or error dict."""
-    action = msg.get("type")
-    table = TableState.load(tn)
-    if not table and action != "ping":
-        return {"error": "Table not found"}
-    if action == "ping" or action == "heartbeat":
-        state = table.to_public_dict() if table else _empty_table_state(tn)
-        return state
-    if action == "start":
-        if not player_id:
-            return {"error": "Player ID required"}
-        if not any(p.id == player_id for p in table.players):
-            return {"error": "Not a player at this table"}
-        err = start_game(table)
-        if err:
-            return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "reveal":
-        if not player_id:
-            return {"error": "Player ID required"}
-        idx = msg.get("card_index", -1)
-        err = reveal_card(table, player_id, idx)
-        if err:
-            return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "draw_from_draw":
-        if not player_id:
-            return {"error": "Player ID required"}
-        err = draw_from_draw(table, player_id)
-        if err:
-            return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "draw_from_discard":
-        if not player_id:
-            return {"error": "Player ID required"}
-        err = draw_from_discard(table, player_id)
-        if err:
-            return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "play_replace":
-        if not player_id:
-            return {"error": "Player ID required"}
-        err = play_replace(table, player_id, msg.get("card_index", -1))
-        if err:
-            return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "play_discard_flip":
-        if not player_id:
-            return {"error": "Player ID required"}
-        err = play_discard_flip(table, player_id, msg.get("card_index", -1))
-        if err:
-            return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "play_discard_only":
-        if not player_id:
-            return {"error": "Player ID required"}
-        err = play_discard_only(table, player_id)
-        if err:
-            return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "play_put_back":
-        if not player_id:
-            return {"error": "Player ID required"}
-        err = play_put_back(table, player_id)
-        if err:
-            return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "play_flip_after_discard":
-        if not player_id:
-            return {"error": "Player ID required"}
-        err = play_flip_after_discard(table, player_id, msg.get("card_index", -1))
+def _restart_threshold(n_players: int) -> int:
+    """Yes votes needed to restart: everyone at a 2-player table, otherwise a majority."""
+    return n_players if n_players == 2 else (n_players + 1) // 2
+
+
+def _ws_start(tn: str, table: TableState, player_id: str | None, msg: dict) -> dict:
+    if not player_id:
+        return {"error": "Player ID required"}
+    if not table.has_player(player_id):
+        return {"error": "Not a player at this table"}
+    err = start_game(table)
+    if err:
+        return {"error": err}
+    _mark_dirty(table)
+    return table.to_public_dict()
+
+
+def _ws_request_restart(tn: str, table: TableState, player_id: str | None, msg: dict) -> dict:
+    if not player_id:
+        return {"error": "Player ID required"}
+    if not table.has_player(player_id):
+        return {"error": "Not a player at this table"}
+    if table.phase not in ("reveal", "play", "scoring"):
+        return {"error": "Game not in progress"}
+    n = len(table.players)
+    if n < 2:
+        return {"error": "Need at least 2 players"}
+    requester = table.players[table.player_index(player_id)]
+    _restart_votes[tn] = {
+        "requested_by": player_id,
+        "requested_by_name": requester.name,
+        "yes_votes": {player_id},
+        "requested_at": time.time(),
+    }
+    if len(_restart_votes[tn]["yes_votes"]) >= _restart_threshold(n):
+        _restart_votes.pop(tn, None)
+        err = restart_game(table)
         if err:
             return {"error": err}
-        table.save()
+        _mark_dirty(table)
+    return table.to_public_dict()
+
+
+def _ws_vote_restart_no(tn: str, table: TableState, player_id: str | None, msg: dict) -> dict:
+    if not player_id:
+        return {"error": "Player ID required"}
+    return table.to_public_dict()
+
+
+def _ws_vote_restart(tn: str, table: TableState, player_id: str | None, msg: dict) -> dict:
+    if not player_id:
+        return {"error": "Player ID required"}
+    if not table.has_player(player_id):
+        return {"error": "Not a player at this table"}
+    vote = _restart_votes.get(tn)
+    if not vote:
         return table.to_public_dict()
-    if action == "advance_scoring":
-        err = advance_from_scoring(table)
+    vote["yes_votes"].add(player_id)
+    if len(vote["yes_votes"]) >= _restart_threshold(len(table.players)):
+        _restart_votes.pop(tn, None)
+        err = restart_game(table)
         if err:
             return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "request_restart":
-        if not player_id:
-            return {"error": "Player ID required"}
-        if not any(p.id == player_id for p in table.players):
-            return {"error": "Not a player at this table"}
-        if table.phase not in ("reveal", "play", "scoring"):
-            return {"error": "Game not in progress"}
-        n = len(table.players)
-        if n < 2:
-            return {"error": "Need at least 2 players"}
-        requester = next(p for p in table.players if p.id == player_id)
-        threshold = n if n == 2 else (n + 1) // 2
-        _restart_votes[tn] = {
-            "requested_by": player_id,
-            "requested_by_name": requester.name,
-            "yes_votes": {player_id},
-            "requested_at": time.time(),
-        }
-        if len(_restart_votes[tn]["yes_votes"]) >= threshold:
-            _restart_votes.pop(tn, None)
-            err = restart_game(table)
-            if err:
-                return {"error": err}
-            table.save()
-            return table.to_public_dict()
-        return table.to_public_dict()
-    if action == "vote_restart_no":
-        if not player_id:
-            return {"error": "Player ID required"}
-        return table.to_public_dict()
-    if action == "vote_restart":
-        if not player_id:
+        _mark_dirty(table)
+    return table.to_public_dict()
+
+
+def _ws_leave(tn: str, table: TableState, player_id: str | None, msg: dict) -> dict:
+    if not player_id:
+        return {"error": "Player ID required"}
+    table.remove_player(player_id)
+    _restart_votes.pop(tn, None)
+    if not table.players:
+        reset_table_to_empty(table)
+    _mark_dirty(table)
+    return table.to_public_dict()
+
+
+# Plain game moves: type -> (game function, takes player_id, takes card_index).
+# Each returns an error string or None; on success the table is marked dirty for
+# _flush_loop to write and its state is broadcast.
+_GAME_ACTIONS = {
+    "reveal": (reveal_card, True, True),
+    "draw_from_draw": (draw_from_draw, True, False),
+    "draw_from_discard": (draw_from_discard, True, False),
+    "play_replace": (play_replace, True, True),
+    "play_discard_flip": (play_discard_flip, True, True),
+    "play_discard_only": (play_discard_only, True, False),
+    "play_put_back": (play_put_back, True, False),
+    "play_flip_after_discard": (play_flip_after_discard, True, True),
+    "advance_scoring": (advance_from_scoring, False, False),
+    "restart": (restart_game, False, False),
+}
+
+# Actions with their own checks or restart-vote bookkeeping
+_WS_HANDLERS = {
+    "start": _ws_start,
+    "request_restart": _ws_request_restart,
+    "vote_restart_no": _ws_vote_restart_no,
+    "vote_restart": _ws_vote_restart,
+    "leave": _ws_leave,
+}
+
+
+async def _handle_ws_action(tn: str, player_id: str | None, msg: dict) -> dict | None:
+    """Process a WebSocket action. Returns state dict on success, or error dict."""
+    action = msg.get("type")
+    table = _get_table(tn)
+    if not table and action != "ping":
+        return {"error": "Table not found"}
+    if action == "ping" or action == "heartbeat" or action == "sync":
+        return table.to_public_dict() if table else _empty_table_state(tn)
+    game_action = _GAME_ACTIONS.get(action)
+    if game_action:
+        fn, takes_player, takes_card = game_action
+        if not takes_player:
+            err = fn(table)
+        elif not player_id:
             return {"error": "Player ID required"}
-        if not any(p.id == player_id for p in table.players):
-            return {"error": "Not a player at this table"}
-        vote = _restart_votes.get(tn)
-        if not vote:
-            return table.to_public_dict()
-        vote["yes_votes"].add(player_id)
-        n = len(table.players)
-        threshold = n if n == 2 else (n + 1) // 2
-        if len(vote["yes_votes"]) >= threshold:
-            _restart_votes.pop(tn, None)
-            err = restart_game(table)
-            if err:
-                return {"error": err}
-            table.save()
-            return table.to_public_dict()
-        return table.to_public_dict()
-    if action == "restart":
-        err = restart_game(table)
+        elif takes_card:
+            err = fn(table, player_id, msg.get("card_index", -1))
+        else:
+            err = fn(table, player_id)
         if err:
             return {"error": err}
-        table.save()
-        return table.to_public_dict()
-    if action == "leave":
-        if not player_id:
-            return {"error": "Player ID required"}
-        table.players = [p for p in table.players if p.id != player_id]
-        _restart_votes.pop(tn, None)
-        if not table.players:
-            reset_table_to_empty(table)
-        table.save()
+        _mark_dirty(table)
         return table.to_public_dict()
+    handler = _WS_HANDLERS.get(action)
+    if handler:
+        return handler(tn, table, player_id, msg)
     return {"error": f"Unknown action: {action}"}
 
 
@@ -418,36 +516,33 @@ async def websocket_endpoint(websocket: WebSocket, table_name: str):
         return
     await websocket.accept()
     player_id = websocket.query_params.get("id")
+    # Set by clients whose browser has DecompressionStream('deflate-raw'); others get plain JSON
+    deflate = websocket.query_params.get("deflate") == "1"
     if player_id and await manager.is_player_connected(tn, player_id):
-        await websocket.send_text(json.dumps({"error": ALREADY_CONNECTED_MSG}))
+        await websocket.send_bytes(_ALREADY_CONNECTED_FRAME)
         await websocket.close()
         return
-    await manager.connect(websocket, tn, player_id)
-    table = TableState.load(tn)
+    await manager.connect(websocket, tn, player_id, deflate)
+    table = _get_table(tn)
     state = table.to_public_dict() if table else _empty_table_state(tn)
     state = await manager.enrich_state_for_clients(tn, state)
-    try:
-        await websocket.send_text(json.dumps(state))
-    except Exception:
-        await manager.disconnect(websocket, tn)
-        return
+    manager.send(websocket, encode_frame(state, deflate))
     try:
         while True:
             raw = await websocket.receive_text()
             try:
-                msg = json.loads(raw) if raw else {}
-            except json.JSONDecodeError:
+                msg = orjson.loads(raw) if raw else {}
+            except orjson.JSONDecodeError:
                 continue
             if msg.get("type") == "heartbeat":
                 await manager.record_heartbeat(websocket, tn)
+            elif msg.get("type") == "sync":
+                await manager.reset_delta_base(tn)
             result = await _handle_ws_action(tn, player_id, msg)
             if result is None:
                 continue
             if "error" in result:
-                try:
-                    await websocket.send_text(json.dumps(result))
-                except Exception:
-                    pass
+                manager.send(websocket, orjson.dumps(result))
             else:
                 await _broadcast_with_restart_state(tn, result)
     except WebSocketDisconnect:
@@ -462,10 +557,10 @@ async def get_table_state(table_name: str):
     ok, tn = validate_table_name(table_name)
     if not ok:
         raise HTTPException(status_code=400, detail="Invalid table name")
-    table = TableState.load(tn)
+    table = _get_table(tn)
     state = table.to_public_dict() if table else _empty_table_state(tn)
     state = await manager.enrich_state_for_clients(tn, state)
-    return _merge_restart_vote_state(tn, state)
+    return ORJSONResponse(_merge_restart_vote_state(tn, state))
 
 
 # Version for PWA cache invalidation (set PLAY9_VERSION on deploy)
@@ -473,7 +568,7 @@ async def get_table_state(table_name: str):
 async def api_version():
     """Return app version so the service worker can invalidate caches on deploy."""
     version = os.environ.get("PLAY9_VERSION", "1")
-    return {"version": version}
+    return ORJSONResponse({"version": version})
 
 
 # Serve service worker at /play9/sw.js with no-cache so updates are picked up on deploy
@@ -1,144 +1,335 @@
-"""WebSocket connection manager for broadcasting game state."""
+"""WebSocket connection manager for broadcasting game state.
+
+Everything here is event-loop bound (queue hand-offs, socket sends, task wake-ups), so
+production runs uvicorn with --loop uvloop; see the Dockerfile.
+"""
 
 import asyncio
-import json
+import contextlib
+import heapq
+import itertools
 import time
-from typing import Dict, List, Optional, Set, Tuple
+import zlib
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
 
+import orjson
 from fastapi import WebSocket
 
 
 HEARTBEAT_TIMEOUT = 20  # seconds without heartbeat before disconnecting
 CLEANUP_INTERVAL = 10  # seconds between stale-connection checks
 INACTIVE_LEAVE_TIMEOUT = 60  # seconds inactive before forcing player to leave table
+CLOCK_TICK = 1  # seconds between refreshes of the manager's cached monotonic clock
+
+DEFLATE_MARKER = b"\x01"  # first byte of a compressed frame; JSON never starts with it
+COMPRESS_MIN_BYTES = 256  # smaller frames go out as plain JSON
+BROADCAST_COALESCE = 0.016  # seconds (one 60 Hz frame); broadcasts within it share one send
+OUTBOX_SIZE = 64  # frames queued per client; a client this far behind is dropped
+THREAD_COMPRESS_MIN_BYTES = 8192  # deflate JSON this large off the event loop
+
+
+def _frame(data: bytes) -> bytes:
+    if len(data) < COMPRESS_MIN_BYTES:
+        return data
+    c = zlib.compressobj(1, zlib.DEFLATED, -15)
+    return DEFLATE_MARKER + c.compress(data) + c.flush()
+
+
+def encode_frame(message: dict, deflate: bool = False) -> bytes:
+    """Binary websocket frame: UTF-8 JSON, or DEFLATE_MARKER + raw deflate for larger states
+    when the client opted in (deflate, as passed to connect())."""
+    data = orjson.dumps(message)
+    return _frame(data) if deflate else data
+
+
+async def _safe_close(ws: WebSocket) -> None:
+    try:
+        await ws.close()
+    except Exception:
+        pass
+
+
+def _state_delta(old, new, path: list, ops: list) -> None:
+    """Append [path, value] set ops (or [path] removals) turning old into new.
+
+    Recurses into dicts, and into same-length lists of dicts (players); anything else
+    that changed is replaced whole."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        for k, v in new.items():
+            if k not in old:
+                ops.append([path + [k], v])
+            elif old[k] != v:
+                _state_delta(old[k], v, path + [k], ops)
+        for k in old.keys() - new.keys():
+            ops.append([path + [k]])
+    elif (
+        isinstance(old, list) and isinstance(new, list) and len(old) == len(new)
+        and new and isinstance(new[0], dict)
+    ):
+        for i, (a, b) in enumerate(zip(old, new)):
+            if a != b:
+                _state_delta(a, b, path + [i], ops)
+    else:
+        ops.append([path, new])
 
 
 class ConnectionManager:
-    """Tracks WebSocket connections per table and broadcasts state updates."""
+    """Tracks WebSocket connections per table and broadcasts state updates.
+
+    Table locks guard bookkeeping only: copy what's needed under the lock, then encode
+    and send after releasing it.
+    """
 
     def __init__(self) -> None:
-        # table_name -> set of (websocket, player_id)
-        self._connections: Dict[str, Set[Tuple[WebSocket, Optional[str]]]] = {}
-        # (table_name, id(websocket)) -> last heartbeat timestamp
-        self._last_heartbeat: Dict[Tuple[str, int], float] = {}
-        # (table_name, id(websocket)) -> last heartbeat epoch (for client countdown)
-        self._last_heartbeat_epoch: Dict[Tuple[str, int], float] = {}
-        # (table_name, player_id) -> when player disconnected (became inactive)
+        # table_name -> {websocket: player_id}
+        self._connections: Dict[str, Dict[WebSocket, Optional[str]]] = {}
+        # table_name -> player_ids with at least one connection, kept in step by
+        # _add_connection/_remove_connection; refcounted since a player may open two tabs
+        self._active_player_ids: Dict[str, Set[str]] = {}
+        self._player_refcount: Dict[Tuple[str, str], int] = {}
+        # (table_name, websocket) -> last heartbeat timestamp
+        self._last_heartbeat: Dict[Tuple[str, WebSocket], float] = {}
+        # (table_name, websocket) -> last heartbeat epoch (for client countdown)
+        self._last_heartbeat_epoch: Dict[Tuple[str, WebSocket], float] = {}
+        # Min-heap of (heartbeat time, tiebreak, table_name, websocket), one entry per heartbeat.
+        # An entry is stale once _last_heartbeat holds a newer time for that key.
+        self._heartbeat_heap: List[Tuple[float, int, str, WebSocket]] = []
+        self._heartbeat_tiebreak = itertools.count()
+        # Coarse monotonic clock, refreshed every CLOCK_TICK by start_clock()'s task;
+        # heartbeat and inactivity timeouts are tens of seconds, so this is plenty
+        self._now = time.monotonic()
+        # (table_name, player_id) -> when player disconnected (became inactive).
+        # Kept in time order (see _mark_inactive) so scans can stop at the first recent entry.
         self._inactive_since: Dict[Tuple[str, str], float] = {}
         # (table_name, player_id) -> when player disconnected, epoch (for client countdown)
         self._inactive_since_epoch: Dict[Tuple[str, str], float] = {}
-        self._lock = asyncio.Lock()
+        # table_name -> lock for that table's bookkeeping; unrelated tables never contend
+        self._table_locks: Dict[str, asyncio.Lock] = {}
+        # table_name -> coroutines holding or waiting on that lock; it's dropped at zero
+        self._lock_users: Dict[str, int] = {}
+        # table_name -> latest state waiting for its coalesced broadcast
+        self._pending_broadcast: Dict[str, dict] = {}
+        # table_name -> task draining _pending_broadcast; one per table keeps frames in order
+        self._flushers: Dict[str, asyncio.Task] = {}
+        # table_name -> last broadcast state and its seq; later broadcasts send only the delta
+        self._last_sent: Dict[str, dict] = {}
+        self._broadcast_seq: Dict[str, int] = {}
+        # websocket -> (outbound frame queue, writer task draining it, client accepts deflate)
+        self._outboxes: Dict[WebSocket, Tuple[asyncio.Queue, asyncio.Task, bool]] = {}
+        self._closing: Set[asyncio.Task] = set()  # in-flight background closes (strong refs)
+
+    def start_clock(self) -> None:
+        """Start refreshing the cached clock. Call once the event loop is running."""
+
+        async def tick() -> None:
+            while True:
+                self._now = time.monotonic()
+                await asyncio.sleep(CLOCK_TICK)
+
+        asyncio.create_task(tick())
+
+    @contextlib.asynccontextmanager
+    async def _lock_for(self, table_name: str) -> AsyncIterator[None]:
+        """Hold the table's lock. The lock is dropped once nobody holds or waits on it and
+        the table has no connections; counting waiters too means a woken waiter never
+        finds its lock replaced by a fresh one."""
+        # No await between lookup and insert, so this is atomic on the event loop
+        lock = self._table_locks.get(table_name)
+        if lock is None:
+            lock = self._table_locks[table_name] = asyncio.Lock()
+        self._lock_users[table_name] = self._lock_users.get(table_name, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            n = self._lock_users.pop(table_name) - 1
+            if n:
+                self._lock_users[table_name] = n
+            elif table_name not in self._connections:
+                del self._table_locks[table_name]
+
+    def _add_connection(self, table_name: str, websocket: WebSocket, player_id: Optional[str]) -> None:
+        self._connections.setdefault(table_name, {})[websocket] = player_id
+        if player_id:
+            key = (table_name, player_id)
+            n = self._player_refcount.get(key, 0)
+            self._player_refcount[key] = n + 1
+            if n == 0:
+                self._active_player_ids.setdefault(table_name, set()).add(player_id)
+
+    def _remove_connection(self, table_name: str, websocket: WebSocket) -> Optional[str]:
+        """Forget websocket; returns its player_id. Caller checks membership first."""
+        conns = self._connections[table_name]
+        player_id = conns.pop(websocket)
+        if player_id:
+            key = (table_name, player_id)
+            n = self._player_refcount.pop(key) - 1
+            if n:
+                self._player_refcount[key] = n
+            else:
+                active = self._active_player_ids[table_name]
+                active.discard(player_id)
+                if not active:
+                    del self._active_player_ids[table_name]
+        if not conns:
+            del self._connections[table_name]
+            # Nobody holds a baseline now; the next subscriber starts over with a full state
+            self._last_sent.pop(table_name, None)
+            self._broadcast_seq.pop(table_name, None)
+        return player_id
+
+    def _start_writer(self, websocket: WebSocket, table_name: str, deflate: bool) -> None:
+        queue: asyncio.Queue = asyncio.Queue(OUTBOX_SIZE)
+        task = asyncio.create_task(self._writer(websocket, table_name, queue))
+        self._outboxes[websocket] = (queue, task, deflate)
+
+    def _stop_writer(self, websocket: WebSocket) -> None:
+        entry = self._outboxes.pop(websocket, None)
+        if entry:
+            entry[1].cancel()
+
+    async def _writer(self, websocket: WebSocket, table_name: str, queue: asyncio.Queue) -> None:
+        """Send this client's frames in order; a failed send drops and closes the connection."""
+        try:
+            while True:
+                await websocket.send_bytes(await queue.get())
+        except Exception:
+            self._outboxes.pop(websocket, None)
+            async with self._lock_for(table_name):
+                self._drop_connection(table_name, websocket, time.time())
+            # Closing ends the endpoint's receive loop, so a client that will never get
+            # another frame stops being served actions
+            self._close_in_background(websocket)
+
+    def send(self, websocket: WebSocket, frame: bytes) -> None:
+        """Queue a frame for one client behind anything already queued for it."""
+        entry = self._outboxes.get(websocket)
+        if entry and not entry[0].full():
+            entry[0].put_nowait(frame)
 
     async def is_player_connected(self, table_name: str, player_id: str) -> bool:
         """True if this player has an active WebSocket for this table."""
-        async with self._lock:
-            conns = self._connections.get(table_name, set())
-            return any(pid == player_id for _, pid in conns if pid)
+        # A single set lookup with no await can't interleave with writers; no lock needed
+        return player_id in self._active_player_ids.get(table_name, ())
 
     def _get_active_player_ids(self, table_name: str) -> List[str]:
-        """Return list of player_ids with active connections (caller must hold _lock)."""
-        conns = self._connections.get(table_name, set())
-        return list({pid for _, pid in conns if pid})
+        """Return list of player_ids with active connections (caller must hold the table lock)."""
+        return list(self._active_player_ids.get(table_name, ()))
 
     async def get_active_player_ids(self, table_name: str) -> List[str]:
         """Return list of player_ids with active connections."""
-        async with self._lock:
-            return self._get_active_player_ids(table_name)
+        return self._get_active_player_ids(table_name)
 
     async def connect(
-        self, websocket: WebSocket, table_name: str, player_id: Optional[str] = None
+        self,
+        websocket: WebSocket,
+        table_name: str,
+        player_id: Optional[str] = None,
+        deflate: bool = False,
     ) -> None:
-        """Register connection. Caller must accept websocket first."""
-        async with self._lock:
+        """Register connection. Caller must accept websocket first. deflate: the client
+        can inflate DEFLATE_MARKER frames; otherwise it only ever gets plain JSON."""
+        async with self._lock_for(table_name):
             if player_id:
                 self._inactive_since.pop((table_name, player_id), None)
                 self._inactive_since_epoch.pop((table_name, player_id), None)
-            if table_name not in self._connections:
-                self._connections[table_name] = set()
-            self._connections[table_name].add((websocket, player_id))
-            key = (table_name, id(websocket))
-            self._last_heartbeat[key] = time.monotonic()
+            self._add_connection(table_name, websocket, player_id)
+            self._start_writer(websocket, table_name, deflate)
+            # The new client's snapshot isn't the broadcast baseline; next broadcast is full
+            self._last_sent.pop(table_name, None)
+            key = (table_name, websocket)
+            self._last_heartbeat[key] = self._push_heartbeat(table_name, websocket)
             self._last_heartbeat_epoch[key] = time.time()
 
+    def _push_heartbeat(self, table_name: str, websocket: WebSocket) -> float:
+        now = self._now
+        entry = (now, next(self._heartbeat_tiebreak), table_name, websocket)
+        heapq.heappush(self._heartbeat_heap, entry)
+        return now
+
     async def record_heartbeat(self, websocket: WebSocket, table_name: str) -> None:
         """Update last heartbeat timestamp for this connection."""
-        async with self._lock:
-            key = (table_name, id(websocket))
+        async with self._lock_for(table_name):
+            key = (table_name, websocket)
             if key in self._last_heartbeat:
-                self._last_heartbeat[key] = time.monotonic()
+                self._last_heartbeat[key] = self._push_heartbeat(table_name, websocket)
                 self._last_heartbeat_epoch[key] = time.time()
 
+    def _mark_inactive(self, table_name: str, player_id: str, now_epoch: float) -> None:
+        key = (table_name, player_id)
+        # Re-insert rather than overwrite so the key moves to the end, keeping time order
+        self._inactive_since.pop(key, None)
+        self._inactive_since[key] = self._now
+        self._inactive_since_epoch[key] = now_epoch
+
+    def _drop_connection(self, table_name: str, websocket: WebSocket, now_epoch: float) -> None:
+        """Unregister websocket and start its player's inactivity clock. Caller holds the
+        table lock. Every removal path (disconnect, stale, failed or slow send) comes here."""
+        key = (table_name, websocket)
+        self._last_heartbeat.pop(key, None)
+        self._last_heartbeat_epoch.pop(key, None)
+        if websocket in self._connections.get(table_name, {}):
+            pid = self._remove_connection(table_name, websocket)
+            if pid:
+                self._mark_inactive(table_name, pid, now_epoch)
+
+    def _close_in_background(self, websocket: WebSocket) -> None:
+        # close() can wait out the whole close handshake timeout; never make callers wait
+        task = asyncio.create_task(_safe_close(websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
     async def disconnect(self, websocket: WebSocket, table_name: str) -> None:
-        async with self._lock:
-            key = (table_name, id(websocket))
-            self._last_heartbeat.pop(key, None)
-            self._last_heartbeat_epoch.pop(key, None)
-            if table_name in self._connections:
-                to_remove = [(ws, pid) for ws, pid in self._connections[table_name] if ws == websocket]
-                now_mono = time.monotonic()
-                now_epoch = time.time()
-                for ws, pid in to_remove:
-                    self._connections[table_name].discard((ws, pid))
-                    if pid:
-                        self._inactive_since[(table_name, pid)] = now_mono
-                        self._inactive_since_epoch[(table_name, pid)] = now_epoch
-                if not self._connections[table_name]:
-                    del self._connections[table_name]
+        self._stop_writer(websocket)
+        async with self._lock_for(table_name):
+            self._drop_connection(table_name, websocket, time.time())
 
     async def cleanup_stale_connections(self, broadcast_fn) -> None:
         """Disconnect connections with no heartbeat in HEARTBEAT_TIMEOUT. Broadcast updated state."""
-        now = time.monotonic()
+        now = self._now
+        stale: Dict[str, List[WebSocket]] = {}  # table_name -> stale websockets
+        seen: Set[Tuple[str, WebSocket]] = set()
+        # Pop only expired heap entries, skipping ones superseded by a later heartbeat or
+        # a disconnect. On the coarse clock a socket can have several entries with the same
+        # time, so each socket is collected at most once per sweep.
+        # No await, so this sees a consistent view without table locks.
+        heap = self._heartbeat_heap
+        while heap and now - heap[0][0] > HEARTBEAT_TIMEOUT:
+            last, _, tn, ws = heapq.heappop(heap)
+            key = (tn, ws)
+            if key in seen:
+                continue
+            if self._last_heartbeat.get(key) == last and ws in self._connections.get(tn, {}):
+                seen.add(key)
+                stale.setdefault(tn, []).append(ws)
         stale_list = []  # [(table_name, websocket), ...]
-        affected_tables = set()
-        async with self._lock:
-            for (tn, ws_id), last in list(self._last_heartbeat.items()):
-                if now - last > HEARTBEAT_TIMEOUT:
-                    conns = self._connections.get(tn, set())
-                    for ws, _ in conns:
-                        if id(ws) == ws_id:
-                            stale_list.append((tn, ws))
-                            affected_tables.add(tn)
-                            break
-            now_epoch = time.time()
-            for tn, ws in stale_list:
-                self._last_heartbeat.pop((tn, id(ws)), None)
-                self._last_heartbeat_epoch.pop((tn, id(ws)), None)
-                conns = self._connections.get(tn, set())
-                to_remove = [(w, pid) for w, pid in conns if w == ws]
-                for w, pid in to_remove:
-                    conns.discard((w, pid))
-                    if pid:
-                        self._inactive_since[(tn, pid)] = time.monotonic()
-                        self._inactive_since_epoch[(tn, pid)] = now_epoch
-                if not conns:
-                    self._connections.pop(tn, None)
-        for tn, ws in stale_list:
-            try:
-                await ws.close()
-            except Exception:
-                pass
-        for tn in affected_tables:
-            await broadcast_fn(tn)
+        for tn, sockets in stale.items():
+            async with self._lock_for(tn):
+                now_epoch = time.time()
+                for ws in sockets:
+                    self._stop_writer(ws)
+                    self._drop_connection(tn, ws, now_epoch)
+                    stale_list.append((tn, ws))
+        for _, ws in stale_list:
+            self._close_in_background(ws)
+        await asyncio.gather(*(broadcast_fn(tn) for tn in stale))
 
     async def get_players_inactive_over_60s(self) -> List[Tuple[str, str]]:
         """Return (table_name, player_id) of players inactive for over INACTIVE_LEAVE_TIMEOUT seconds."""
-        now = time.monotonic()
+        now = self._now
         result = []
-        async with self._lock:
-            active = {
-                (tn, pid)
-                for tn in self._connections
-                for _, pid in self._connections[tn]
-                if pid
-            }
-            for (tn, pid), since in list(self._inactive_since.items()):
-                if (tn, pid) not in active and (now - since) > INACTIVE_LEAVE_TIMEOUT:
-                    result.append((tn, pid))
+        # Read-only scan across tables with no await; no table lock needed.
+        # Entries are oldest first, so stop at the first one still inside the timeout.
+        for (tn, pid), since in self._inactive_since.items():
+            if now - since <= INACTIVE_LEAVE_TIMEOUT:
+                break
+            if pid not in self._active_player_ids.get(tn, ()):
+                result.append((tn, pid))
         return result
 
     async def clear_inactive(self, table_name: str, player_id: str) -> None:
         """Remove player from inactive tracking (after forced leave)."""
-        async with self._lock:
+        async with self._lock_for(table_name):
             self._inactive_since.pop((table_name, player_id), None)
             self._inactive_since_epoch.pop((table_name, player_id), None)
 
@@ -150,7 +341,7 @@ class ConnectionManager:
         now_epoch = time.time()
         for ws, pid in conns:
             if pid:
-                key = (table_name, id(ws))
+                key = (table_name, ws)
                 result[pid] = self._last_heartbeat_epoch.get(key, now_epoch)
         for pid in player_ids:
             if pid not in result:
@@ -161,8 +352,8 @@ class ConnectionManager:
 
     async def enrich_state_for_clients(self, table_name: str, state: dict) -> dict:
         """Add active_player_ids, player_last_active, inactive_turn_name for REST/WS initial send."""
-        async with self._lock:
-            conns = list(self._connections.get(table_name, []))
+        async with self._lock_for(table_name):
+            conns = list(self._connections.get(table_name, {}).items())
             active_ids = self._get_active_player_ids(table_name)
             player_ids = [p.get("id") for p in (state.get("players") or []) if p.get("id")]
             player_last_active = self._get_player_last_active_epoch(
@@ -193,25 +384,86 @@ class ConnectionManager:
                                 state["inactive_turn_name"] = current.get("name", "Player")
         return state
 
+    async def reset_delta_base(self, table_name: str) -> None:
+        """Make the next broadcast a full state (a client lost track of the deltas)."""
+        async with self._lock_for(table_name):
+            self._last_sent.pop(table_name, None)
+
     async def broadcast_table(self, table_name: str, state: dict) -> None:
-        """Send state to all clients subscribed to this table."""
+        """Queue state for all clients subscribed to this table.
+
+        Sent after BROADCAST_COALESCE; a burst of updates in that window goes out once,
+        as the latest state."""
+        self._pending_broadcast[table_name] = state
+        if table_name not in self._flushers:
+            self._flushers[table_name] = asyncio.create_task(self._flush_broadcasts(table_name))
+
+    async def _flush_broadcasts(self, table_name: str) -> None:
+        try:
+            while table_name in self._pending_broadcast:
+                await asyncio.sleep(BROADCAST_COALESCE)
+                await self._send_state(table_name, self._pending_broadcast.pop(table_name))
+        finally:
+            del self._flushers[table_name]
+
+    def _snapshot_for_broadcast(
+        self, table_name: str, state: dict
+    ) -> Optional[Tuple[dict, List[WebSocket]]]:
+        """Advance the table's delta baseline to state. Returns (message, subscribers), or
+        None if nothing changed or nobody is subscribed. Caller must hold the table lock."""
+        conns = self._connections.get(table_name)
+        if not conns:
+            return None  # don't recreate per-table state _remove_connection just dropped
+        base = self._last_sent.get(table_name)
+        if base is not None:
+            ops: list = []
+            _state_delta(base, state, [], ops)
+            if not ops:
+                return None
+        seq = self._broadcast_seq.get(table_name, 0) + 1
+        self._broadcast_seq[table_name] = seq
+        self._last_sent[table_name] = state
+        # Full states carry their seq; a delta applies only on top of seq - 1
+        message = {**state, "seq": seq} if base is None else {"delta": ops, "seq": seq}
+        return message, list(conns)
+
+    async def _send_state(self, table_name: str, state: dict) -> None:
         state = await self.enrich_state_for_clients(table_name, state)
-        async with self._lock:
-            conns = list(self._connections.get(table_name, []))
-        dead_ws = []
-        for ws, _ in conns:
+        async with self._lock_for(table_name):
+            snapshot = self._snapshot_for_broadcast(table_name, state)
+        if snapshot is None:
+            return  # nothing changed since the last frame, or nobody to send it to
+        message, conns = snapshot
+        # Encode and compress once, outside the lock; subscribers share one of two frames.
+        # Encoding takes microseconds; only an outsized payload's deflate goes to a thread.
+        data = orjson.dumps(message)
+        compressed = None
+        if len(data) >= COMPRESS_MIN_BYTES and any(
+            self._outboxes[ws][2] for ws in conns if ws in self._outboxes
+        ):
+            if len(data) < THREAD_COMPRESS_MIN_BYTES:
+                compressed = _frame(data)
+            else:
+                compressed = await asyncio.to_thread(_frame, data)
+        # Hand the frame to each client's writer; one that can't keep up is dropped
+        slow = []
+        for ws in conns:
+            entry = self._outboxes.get(ws)
+            if entry is None:
+                continue
             try:
-                await ws.send_text(json.dumps(state))
-            except Exception:
-                dead_ws.append(ws)
-        if dead_ws:
-            async with self._lock:
-                s = self._connections.get(table_name)
-                if s:
-                    for ws in dead_ws:
-                        to_discard = next((x for x in s if x[0] == ws), None)
-                        if to_discard:
-                            s.discard(to_discard)
-
+                entry[0].put_nowait(compressed if entry[2] and compressed else data)
+            except asyncio.QueueFull:
+                slow.append(ws)
+        if slow:
+            async with self._lock_for(table_name):
+                now_epoch = time.time()
+                for ws in slow:
+                    self._stop_writer(ws)
+                    self._drop_connection(table_name, ws, now_epoch)
+            # Not awaited: a client too slow to keep up won't answer the close handshake
+            # quickly either, and this flusher must not stall the table's later broadcasts
+            for ws in slow:
+                self._close_in_background(ws)
 
 manager = ConnectionManager()
@@ -25,14 +25,85 @@ window.Play9 = (function () {
     return val != null && val > FACE_DOWN_MASK;
   }
 
+  const utf8Decoder = new TextDecoder();
+  // Binary frames starting with this byte carry raw-deflate JSON; others are plain UTF-8 JSON
+  const DEFLATE_MARKER = 1;
+  // Only clients that can inflate ask the server for compressed frames (see getWsUrl)
+  const SUPPORTS_DEFLATE_RAW = (function () {
+    try {
+      new DecompressionStream('deflate-raw');
+      return true;
+    } catch (e) {
+      return false;
+    }
+  })();
+  let frameChain = Promise.resolve();
+
+  async function decodeFrame(data) {
+    if (typeof data === 'string') return data;
+    const bytes = new Uint8Array(data);
+    if (bytes[0] !== DEFLATE_MARKER) return utf8Decoder.decode(bytes);
+    const stream = new Blob([bytes.subarray(1)]).stream().pipeThrough(new DecompressionStream('deflate-raw'));
+    return new Response(stream).text();
+  }
+
+  // Apply server delta ops ([path, value] sets, [path] removals) to a copy of base.
+  // Containers along each path are copied so the previous state object stays intact.
+  function applyDelta(base, ops) {
+    const root = Object.assign({}, base);
+    for (const op of ops) {
+      const path = op[0];
+      let node = root;
+      for (let i = 0; i < path.length - 1; i++) {
+        const child = node[path[i]];
+        node = node[path[i]] = Array.isArray(child) ? child.slice() : Object.assign({}, child);
+      }
+      const key = path[path.length - 1];
+      if (op.length > 1) node[key] = op[1];
+      else delete node[key];
+    }
+    return root;
+  }
+
+  // ws.onmessage handler (ws.binaryType = 'arraybuffer'). Inflating is async, so frames are
+  // chained to reach handler in arrival order. Delta frames are applied to the last full
+  // state; if one doesn't follow on from it, resync() asks the server for a full state.
+  function onServerMessage(handler, resync) {
+    let state = null;
+    let seq = null;
+    return function (ev) {
+      frameChain = frameChain
+        .then(() => decodeFrame(ev.data))
+        .then((text) => {
+          const data = JSON.parse(text);
+          if (data.delta) {
+            if (state === null || data.seq !== seq + 1) {
+              resync();
+              return;
+            }
+            state = applyDelta(state, data.delta);
+            seq = data.seq;
+            handler(state);
+            return;
+          }
+          if (!data.error) {
+            state = data;
+            seq = data.seq != null ? data.seq : null;
+          }
+          handler(data);
+        })
+        .catch((e) => console.error('Invalid WS message:', e));
+    };
+  }
+
   function scoreHand(hand) {
     if (!hand || hand.length !== 8) return 0;
     const cols = [];
     for (let i = 0; i < 4; i++) cols.push([hand[i], hand[i + 4]]);
     let total = 0;
     for (const col of cols) {
-      const v0 = col[0]?.value ?? 0;
-      const v1 = col[1]?.value ?? 0;
+      const v0 = col[0] ?? 0;
+      const v1 = col[1] ?? 0;
       if (v0 > FACE_DOWN_MASK && v1 > FACE_DOWN_MASK) {
         if (v0 === v1) {
           total += v0 === -5 ? -10 : 0;
@@ -43,7 +114,7 @@ window.Play9 = (function () {
     }
     const pairValues = [];
     for (const col of cols) {
-      const v0 = col[0]?.value, v1 = col[1]?.value;
+      const v0 = col[0], v1 = col[1];
       if (v0 > FACE_DOWN_MASK && v1 > FACE_DOWN_MASK && v0 === v1) pairValues.push(v0);
     }
     const counts = {};
@@ -185,7 +256,7 @@ window.Play9 = (function () {
       const grid = document.createElement('div');
       grid.className = 'full-table-card-grid';
       (p.hand || []).forEach((card, ci) => {
-        const isJustFlipped = card.face_up && justFlipped[i] && justFlipped[i].indexOf(ci) !== -1;
+        const isJustFlipped = isCardValueKnown(card) && justFlipped[i] && justFlipped[i].indexOf(ci) !== -1;
         if (isJustFlipped) {
           const flipWrapper = document.createElement('div');
           flipWrapper.className = 'full-table-card-flip-wrapper';
@@ -195,7 +266,7 @@ window.Play9 = (function () {
           backFace.className = 'full-table-card-face full-table-card-face-back';
           const frontFace = document.createElement('div');
           frontFace.className = 'full-table-card-face full-table-card-face-front';
-          frontFace.textContent = isCardValueKnown(card.value) ? String(card.value) : '';
+          frontFace.textContent = isCardValueKnown(card) ? String(card) : '';
           flipInner.appendChild(backFace);
           flipInner.appendChild(frontFace);
           flipWrapper.appendChild(flipInner);
@@ -209,10 +280,10 @@ window.Play9 = (function () {
           });
         } else {
           const c = document.createElement('div');
-          let cls = 'card' + (card.face_up ? ' face-up' : ' face-down');
+          let cls = 'card' + (isCardValueKnown(card) ? ' face-up' : ' face-down');
           if (isLastAffectedCard(state, p.id, ci)) cls += ' last-affected';
           c.className = cls;
-          c.textContent = card.face_up && isCardValueKnown(card.value) ? card.value : '';
+          c.textContent = isCardValueKnown(card) ? card : '';
           grid.appendChild(c);
         }
       });
@@ -297,7 +368,7 @@ window.Play9 = (function () {
     const toRect = discardEl.getBoundingClientRect();
     var ghost = document.createElement('div');
     ghost.className = 'card-ghost-to-discard card face-up';
-    ghost.textContent = isCardValueKnown(spec.card && spec.card.value) ? String(spec.card.value) : '';
+    ghost.textContent = isCardValueKnown(spec.card) ? String(spec.card) : '';
     ghost.style.position = 'fixed';
     ghost.style.left = fromRect.left + 'px';
     ghost.style.top = fromRect.top + 'px';
@@ -353,7 +424,7 @@ window.Play9 = (function () {
         let cls = 'card face-up';
         if (isLastAffectedCard(state, me.id, i)) cls += ' last-affected';
         el.className = cls;
-        el.textContent = card.face_up && isCardValueKnown(card.value) ? card.value : '';
+        el.textContent = isCardValueKnown(card) ? card : '';
         grid.appendChild(el);
       });
       bottom.appendChild(grid);
@@ -387,7 +458,7 @@ window.Play9 = (function () {
           let cls = 'card face-up';
           if (isLastAffectedCard(state, p.id, ci)) cls += ' last-affected';
           c.className = cls;
-          c.textContent = card.face_up && isCardValueKnown(card.value) ? card.value : '';
+          c.textContent = isCardValueKnown(card) ? card : '';
           grid.appendChild(c);
         });
         slot.appendChild(grid);
@@ -539,6 +610,8 @@ window.Play9 = (function () {
     playerDisplayName,
     pileRotation,
     isCardValueKnown,
+    onServerMessage,
+    supportsDeflateRaw: SUPPORTS_DEFLATE_RAW,
     scoreHand,
     createStackedDrawPile,
     createStackedDiscardPile,
@@ -33,7 +33,7 @@
 
   function getWsUrl() {
     const proto = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    return `${proto}//${window.location.host}/play9/ws/${tableName}?id=${encodeURIComponent(playerId)}`;
+    return `${proto}//${window.location.host}/play9/ws/${tableName}?id=${encodeURIComponent(playerId)}${Play9.supportsDeflateRaw ? '&deflate=1' : ''}`;
   }
 
   const INACTIVE_LEAVE_TIMEOUT = 60;
@@ -216,7 +216,7 @@
     const discardRect = discardEl.getBoundingClientRect();
     const ghost = document.createElement('div');
     ghost.className = 'card-ghost-to-discard card face-up';
-    ghost.textContent = Play9.isCardValueKnown(card.value) ? String(card.value) : '';
+    ghost.textContent = Play9.isCardValueKnown(card) ? String(card) : '';
     ghost.style.position = 'fixed';
     ghost.style.left = slotRect.left + 'px';
     ghost.style.top = slotRect.top + 'px';
@@ -274,7 +274,7 @@
       var prevMe = lastStateForDrawAnimation.players && lastStateForDrawAnimation.players.find(function (p) { return p.id === playerId; });
       if (me && prevMe && me.hand && prevMe.hand && me.hand.length === 8 && prevMe.hand.length === 8) {
         for (var fi = 0; fi < 8; fi++) {
-          if (!prevMe.hand[fi].face_up && me.hand[fi].face_up) justFlippedCardIndices.push(fi);
+          if (!Play9.isCardValueKnown(prevMe.hand[fi]) && Play9.isCardValueKnown(me.hand[fi])) justFlippedCardIndices.push(fi);
         }
       }
     }
@@ -377,7 +377,7 @@
       const center = document.createElement('div');
       center.className = 'player-view-center';
       if (state.phase === 'play') {
-        const allFaceUp = me.hand.every(c => c.face_up);
+        const allFaceUp = me.hand.every(Play9.isCardValueKnown);
         if (allFaceUp) {
           const msg = document.createElement('p');
           msg.className = 'center-instruction center-instruction-score';
@@ -417,7 +417,7 @@
       const flipIndices = justFlippedCardIndices || [];
       justFlippedCardIndices = null;
       me.hand.forEach((card, i) => {
-        const isJustFlipped = card.face_up && flipIndices.indexOf(i) !== -1;
+        const isJustFlipped = Play9.isCardValueKnown(card) && flipIndices.indexOf(i) !== -1;
         var el;
         if (isJustFlipped) {
           const flipWrapper = document.createElement('div');
@@ -428,7 +428,7 @@
           backFace.className = 'card-face card-face-back';
           const frontFace = document.createElement('div');
           frontFace.className = 'card-face card-face-front';
-          frontFace.textContent = Play9.isCardValueKnown(card.value) ? String(card.value) : '';
+          frontFace.textContent = Play9.isCardValueKnown(card) ? String(card) : '';
           flipInner.appendChild(backFace);
           flipInner.appendChild(frontFace);
           flipWrapper.appendChild(flipInner);
@@ -443,19 +443,19 @@
           });
         } else {
           el = document.createElement('div');
-          let cls = 'card' + (card.face_up ? ' face-up' : ' face-down');
+          let cls = 'card' + (Play9.isCardValueKnown(card) ? ' face-up' : ' face-down');
           if (Play9.isLastAffectedCard(state, me.id, i)) cls += ' last-affected';
           el.className = cls;
-          el.textContent = card.face_up && Play9.isCardValueKnown(card.value) ? card.value : '';
+          el.textContent = Play9.isCardValueKnown(card) ? card : '';
           if (state.phase === 'reveal') {
-            const canFlip = !card.face_up && me.revealed_count < 2;
+            const canFlip = !Play9.isCardValueKnown(card) && me.revealed_count < 2;
             if (canFlip) {
               el.classList.add('clickable');
               el.addEventListener('click', () => flipCard(i));
             }
           } else if (state.phase === 'play' && isMyTurn) {
             if (state.must_flip_after_discard) {
-              if (!card.face_up) {
+              if (!Play9.isCardValueKnown(card)) {
                 el.classList.add('clickable', 'highlight');
                 el.addEventListener('click', () => sendAction({ type: 'play_flip_after_discard', card_index: i }));
               }
@@ -493,6 +493,7 @@
   function connect() {
     if (ws && ws.readyState === WebSocket.OPEN) return;
     ws = new WebSocket(getWsUrl());
+    ws.binaryType = 'arraybuffer';
     ws.onopen = function () {
       if (reconnectTimer) {
         clearTimeout(reconnectTimer);
@@ -502,31 +503,26 @@
         if (ws && ws.readyState === WebSocket.OPEN) sendAction({ type: 'heartbeat' });
       }, HEARTBEAT_INTERVAL);
     };
-    ws.onmessage = function (ev) {
-      try {
-        const data = JSON.parse(ev.data);
-        if (data.error) {
-          if (data.error === 'Player already connected elsewhere') {
-            document.getElementById('already-connected-dialog').hidden = false;
-            if (reconnectTimer) { clearTimeout(reconnectTimer); reconnectTimer = null; }
-            ws = null;
-            return;
-          }
-          if (data.error === 'Game already started') {
-            sendAction({ type: 'request_restart' });
-            return;
-          }
-          if (data.error !== 'Not a player at this table' && data.error !== 'Card already face-up') {
-            showErrorDialog(data.error);
-          }
-          if (waitingRoomDialog && !waitingRoomDialog.hidden && startBtn) startBtn.disabled = false;
+    ws.onmessage = Play9.onServerMessage(function (data) {
+      if (data.error) {
+        if (data.error === 'Player already connected elsewhere') {
+          document.getElementById('already-connected-dialog').hidden = false;
+          if (reconnectTimer) { clearTimeout(reconnectTimer); reconnectTimer = null; }
+          ws = null;
           return;
         }
-        applyState(data);
-      } catch (e) {
-        console.error('Invalid WS message:', e);
+        if (data.error === 'Game already started') {
+          sendAction({ type: 'request_restart' });
+          return;
+        }
+        if (data.error !== 'Not a player at this table' && data.error !== 'Card already face-up') {
+          showErrorDialog(data.error);
+        }
+        if (waitingRoomDialog && !waitingRoomDialog.hidden && startBtn) startBtn.disabled = false;
+        return;
       }
-    };
+      applyState(data);
+    }, () => sendAction({ type: 'sync' }));
     ws.onclose = function () {
       ws = null;
       if (pingTimer) { clearInterval(pingTimer); pingTimer = null; }
@@ -27,7 +27,7 @@
 
   function getWsUrl() {
     const proto = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    return `${proto}//${window.location.host}/play9/ws/${tableName}`;
+    return `${proto}//${window.location.host}/play9/ws/${tableName}${Play9.supportsDeflateRaw ? '?deflate=1' : ''}`;
   }
 
   let ws = null;
@@ -114,7 +114,7 @@
         if (!prevP || !p.hand || !prevP.hand || p.hand.length !== 8 || prevP.hand.length !== 8) return;
         var indices = [];
         for (var fi = 0; fi < 8; fi++) {
-          if (!prevP.hand[fi].face_up && p.hand[fi].face_up) indices.push(fi);
+          if (!Play9.isCardValueKnown(prevP.hand[fi]) && Play9.isCardValueKnown(p.hand[fi])) indices.push(fi);
         }
         if (indices.length) justFlippedByPlayer[pi] = indices;
       });
@@ -128,7 +128,7 @@
         if (currHand && prevHand && drawnCard && currHand.length === 8 && prevHand.length === 8) {
           var replaceSlot = -1;
           for (var si = 0; si < 8; si++) {
-            if (prevHand[si].face_up !== currHand[si].face_up || (prevHand[si].value !== currHand[si].value)) {
+            if (prevHand[si] !== currHand[si]) {
               replaceSlot = si;
               break;
             }
@@ -179,6 +179,7 @@
   function connect() {
     if (ws && ws.readyState === WebSocket.OPEN) return;
     ws = new WebSocket(getWsUrl());
+    ws.binaryType = 'arraybuffer';
     ws.onopen = function () {
       if (reconnectTimer) {
         clearTimeout(reconnectTimer);
@@ -188,20 +189,15 @@
         if (ws && ws.readyState === WebSocket.OPEN) sendAction({ type: 'heartbeat' });
       }, HEARTBEAT_INTERVAL);
     };
-    ws.onmessage = function (ev) {
-      try {
-        const data = JSON.parse(ev.data);
-        if (data.error) {
-          if (data.error !== 'Not a player at this table') {
-            showErrorDialog(data.error);
-          }
-          return;
+    ws.onmessage = Play9.onServerMessage(function (data) {
+      if (data.error) {
+        if (data.error !== 'Not a player at this table') {
+          showErrorDialog(data.error);
         }
-        applyState(data);
-      } catch (e) {
-        console.error('Invalid WS message:', e);
+        return;
       }
-    };
+      applyState(data);
+    }, () => sendAction({ type: 'sync' }));
     ws.onclose = function () {
       ws = null;
       if (pingTimer) {